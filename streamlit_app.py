@@ -1,10 +1,12 @@
 import streamlit as st
 import sqlite3
 import hashlib
+import hmac
 import uuid
 import datetime
-import pandas as pd
 from threading import Lock
+from queue import Queue, Empty, Full
+from contextlib import contextmanager
 import os
 import time
 
@@ -12,11 +14,41 @@ import time
 st.set_page_config(page_title="Code & Thread Shop - Premium", layout="wide", initial_sidebar_state="expanded")
 
 DB_NAME = 'tshirt_shop_premium.db'
+CATALOG_PAGE_SIZE = 12
+# Idle read-only connections DBManager keeps open; busier moments open extras that are closed on return
+READ_POOL_SIZE = 8
+# Stored in PRAGMA user_version; bump it and add a step to DBManager.migrate for every schema change
+SCHEMA_VERSION = 1
+# Filled into st.session_state once per session (callables give each session its own fresh object)
+SESSION_DEFAULTS = {'logged_in': False, 'page': 'login', 'cart': list, 'catalog_page': 0}
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+PASSWORD_SCHEME = 'scrypt$'
+
+def hash_password(password, salt):
+    # scrypt is deliberately slow and memory-hard (16 MB per call), which is what makes leaked hashes expensive to crack
+    return PASSWORD_SCHEME + hashlib.scrypt(password.encode(), salt=salt, n=2**14, r=8, p=1).hex()
+
+# Checked against when the email is unknown, so a miss costs the same scrypt call as a real account
+DUMMY_SALT, DUMMY_HASH = bytes(16), PASSWORD_SCHEME + '0' * 128
+
+def password_outdated(salt, stored):
+    return salt is None or not stored.startswith(PASSWORD_SCHEME)
+
+def verify_password(password, salt, stored):
+    # Older accounts: no salt means a bare SHA-256 digest, no scheme prefix means salted HMAC-SHA256
+    if salt is None: expected = hashlib.sha256(password.encode()).hexdigest()
+    elif not stored.startswith(PASSWORD_SCHEME): expected = hmac.new(salt, password.encode(), 'sha256').hexdigest()
+    else: expected = hash_password(password, salt)
+    return hmac.compare_digest(stored, expected)
 
 # --- DATABASE INITIALIZATION ---
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_products_category ON PRODUCTS(category)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_date ON ORDERS(order_date)",
+    "CREATE INDEX IF NOT EXISTS idx_order_items_order ON ORDER_ITEMS(order_id)",
+    "CREATE INDEX IF NOT EXISTS idx_defects_product ON DEFECTS(product_id)",
+]
+
 def initialize_database(target_db_path):
     if os.path.exists(target_db_path):
         os.remove(target_db_path)
@@ -25,56 +57,140 @@ def initialize_database(target_db_path):
     c = conn.cursor()
     with conn: 
         c.executescript('''
-            CREATE TABLE USERS (email TEXT PRIMARY KEY, username TEXT, password_hash TEXT, role TEXT, profile_pic_url TEXT, birthday TEXT);
+            CREATE TABLE USERS (email TEXT PRIMARY KEY, username TEXT, password_hash TEXT, role TEXT, profile_pic_url TEXT, birthday TEXT, salt BLOB);
             CREATE TABLE PRODUCTS (product_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, description TEXT, category TEXT, price REAL, cost REAL, stock INTEGER, image_url TEXT);
             CREATE TABLE ORDERS (order_id TEXT PRIMARY KEY, email TEXT, order_date TEXT, total_amount REAL, total_cost REAL, total_profit REAL, status TEXT, full_name TEXT, address TEXT, city TEXT, zip_code TEXT);
             CREATE TABLE ORDER_ITEMS (item_id INTEGER PRIMARY KEY AUTOINCREMENT, order_id TEXT, product_id INTEGER, size TEXT, quantity INTEGER, unit_price REAL, unit_cost REAL);
             CREATE TABLE DISCOUNTS (code TEXT PRIMARY KEY, discount_type TEXT, value REAL, is_active INTEGER);
             CREATE TABLE DEFECTS (defect_id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER, defect_date TEXT, quantity INTEGER, reason TEXT);
-        ''')
+        ''' + ";\n".join(INDEXES))
         # Seed Data
-        c.execute("INSERT INTO USERS VALUES (?, ?, ?, ?, ?, ?)", ('admin@shop.com', 'Admin User', hash_password('admin'), 'admin', 'https://placehold.co/100', '1990-01-01'))
-        c.execute("INSERT INTO PRODUCTS (name, description, category, price, cost, stock, image_url) VALUES (?, ?, ?, ?, ?, ?, ?)", 
-                  ('Vintage Coding Tee', 'Cotton t-shirt.', 'T-Shirt', 25.00, 10.00, 95, 'https://placehold.co/400x400/36454F/FFFFFF?text=Code+Tee'))
-        c.execute("INSERT INTO PRODUCTS (name, description, category, price, cost, stock, image_url) VALUES (?, ?, ?, ?, ?, ?, ?)", 
-                  ('Python Logo Hoodie', 'Warm hoodie.', 'Hoodie', 55.00, 25.00, 48, 'https://placehold.co/400x400/FFD700/000000?text=Python+Hoodie'))
-        c.execute("INSERT INTO DEFECTS (product_id, defect_date, quantity, reason) VALUES (1, '2023-10-01', 5, 'Printing Error')")
+        salt = os.urandom(16)
+        c.execute("INSERT INTO USERS VALUES (?, ?, ?, ?, ?, ?, ?)", ('admin@shop.com', 'Admin User', hash_password('admin', salt), 'admin', 'https://placehold.co/100', '1990-01-01', salt))
+        products = [
+            ('Vintage Coding Tee', 'Cotton t-shirt.', 'T-Shirt', 25.00, 10.00, 95, 'https://placehold.co/400x400/36454F/FFFFFF?text=Code+Tee'),
+            ('Python Logo Hoodie', 'Warm hoodie.', 'Hoodie', 55.00, 25.00, 48, 'https://placehold.co/400x400/FFD700/000000?text=Python+Hoodie'),
+        ]
+        # A single multi-row INSERT: one statement through the engine for the whole seed list
+        c.execute("INSERT INTO PRODUCTS (name, description, category, price, cost, stock, image_url) VALUES " + ", ".join(["(?, ?, ?, ?, ?, ?, ?)"] * len(products)),
+                  [x for row in products for x in row])
+        ids = dict(c.execute("SELECT name, product_id FROM PRODUCTS WHERE name IN (?, ?)", ('Vintage Coding Tee', 'Python Logo Hoodie')).fetchall())
+        c.executemany("INSERT INTO DEFECTS (product_id, defect_date, quantity, reason) VALUES (?, ?, ?, ?)", [
+            (ids['Vintage Coding Tee'], '2023-10-01', 5, 'Printing Error'),
+        ])
+        c.execute("ANALYZE")  # give the planner statistics for the secondary indexes
+        c.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
 
+# One read-write connection shared behind a lock; reads check out a read-only connection from a pool
 class DBManager:
     def __init__(self, db_path):
         self.db_path = db_path
         self._lock = Lock()
-        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Autocommit mode: no implicit BEGINs, every write opens its own BEGIN IMMEDIATE via transaction()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
         self._conn.row_factory = sqlite3.Row
+        # WAL lets readers run alongside the writer; NORMAL syncs once per checkpoint instead of every commit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._tune(self._conn)
+        # Streamlit runs every rerun on a fresh thread, so readers are pooled here rather than kept per thread
+        self._readers = Queue(maxsize=READ_POOL_SIZE)
+
+    @staticmethod
+    def _tune(conn):
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+
+    def migrate(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION: return
+        with self.transaction() as conn:
+            if version < 1:
+                # Files created before versioning may lack the salt column and the secondary indexes
+                if 'salt' not in {r['name'] for r in conn.execute("PRAGMA table_info(USERS)")}:
+                    conn.execute("ALTER TABLE USERS ADD COLUMN salt BLOB")
+                for ddl in INDEXES: conn.execute(ddl)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
 
-    def query(self, q, p=(), commit=False):
-        with self._lock:
-            c = self._conn.cursor()
-            res = c.execute(q, p)
-            if commit: self._conn.commit()
-            return res.fetchall()
+    @contextmanager
+    def reader(self):
+        try: conn = self._readers.get_nowait()
+        except Empty:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._tune(conn)
+        try: yield conn
+        finally:
+            try: self._readers.put_nowait(conn)
+            except Full: conn.close()
+
+    @contextmanager
+    def transaction(self):
+        # Commits when the block exits cleanly, rolls back if it raises; IMMEDIATE takes the write lock up front
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            yield self._conn
+
+    def query(self, q, p=()):
+        with self.reader() as conn:
+            return conn.execute(q, p).fetchall()
+
+    def execute(self, q, p=()):
+        with self.transaction() as conn:
+            return conn.execute(q, p).rowcount
 
     def query_df(self, q, p=()):
-        with self._lock: return pd.read_sql_query(q, self._conn, params=p)
+        import pandas as pd
+        with self.reader() as conn:
+            cur = conn.execute(q, p)
+            return pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
 
 @st.cache_resource
 def get_db():
     if not os.path.exists(DB_NAME): initialize_database(DB_NAME)
-    return DBManager(DB_NAME)
+    manager = DBManager(DB_NAME)
+    manager.migrate()
+    return manager
 
 db = get_db()
 
+# --- CACHED QUERIES ---
+# Call .clear() on these after writes that change what they return; the TTL bounds staleness from anything else
+@st.cache_data(max_entries=1, ttl=300)
+def get_categories():
+    return [r['category'] for r in db.query("SELECT DISTINCT category FROM PRODUCTS ORDER BY category")]
+
+@st.cache_data(max_entries=256, ttl=300)
+def get_catalog_page(category, search, page):
+    # Filtering stays in SQLite: LIKE is case-insensitive for ASCII and runs in C
+    where, p = [], []
+    if category != "All": where.append("category=?"); p.append(category)
+    if search: where.append("(name LIKE ? OR description LIKE ? OR category LIKE ?)"); p += [f"%{search}%"] * 3
+    # Only the columns the grid shows, one page (plus one row to detect a next page) at a time
+    q = "SELECT product_id, name, price, image_url FROM PRODUCTS" + (" WHERE " + " AND ".join(where) if where else "")
+    return [tuple(r) for r in db.query(q + " ORDER BY product_id LIMIT ? OFFSET ?", (*p, CATALOG_PAGE_SIZE + 1, page * CATALOG_PAGE_SIZE))]
+
+@st.cache_data(max_entries=256, ttl=300)
+def get_product(product_id):
+    res = db.query("SELECT name, description, price, cost, stock, image_url FROM PRODUCTS WHERE product_id=?", (product_id,))
+    return tuple(res[0]) if res else None
+
 # --- ADMIN FUNCTIONS ---
 def admin_analytics():
+    import pandas as pd
     st.subheader("📊 Sales Analytics")
-    df = db.query_df("SELECT * FROM ORDERS")
+    # One row per day straight from SQLite instead of grouping every order in pandas
+    df = db.query_df("SELECT DATE(order_date) AS date, SUM(total_amount) AS total_amount, SUM(total_profit) AS total_profit "
+                     "FROM ORDERS GROUP BY DATE(order_date) ORDER BY 1")
     if df.empty:
         st.info("No sales recorded."); return
     c1, c2 = st.columns(2)
     c1.metric("Revenue", f"${df['total_amount'].sum():.2f}")
     c2.metric("Profit", f"${df['total_profit'].sum():.2f}")
-    df['date'] = pd.to_datetime(df['order_date']).dt.date
-    st.line_chart(df.groupby('date').sum()[['total_amount', 'total_profit']])
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d').dt.date
+    st.line_chart(df.set_index('date')[['total_amount', 'total_profit']])
 
 def admin_defects():
     st.subheader("⚠️ Quality Control")
@@ -83,61 +199,167 @@ def admin_defects():
         st.bar_chart(df.groupby('reason')['quantity'].sum())
         st.dataframe(df)
 
+PRODUCT_COLUMNS = ['name', 'description', 'category', 'price', 'cost', 'stock', 'image_url']
+# The shop and checkout render these unguarded, so one blank would break them for every user
+REQUIRED_PRODUCT_COLUMNS = ['name', 'category', 'price', 'cost', 'stock', 'image_url']
+
+def insert_products(rows):
+    with db.transaction() as conn:
+        conn.executemany(f"INSERT INTO PRODUCTS ({', '.join(PRODUCT_COLUMNS)}) VALUES ({', '.join('?' * len(PRODUCT_COLUMNS))})", rows)
+    get_categories.clear(); get_catalog_page.clear(); inventory_table.clear()
+
+def admin_bulk_upload():
+    st.subheader("📦 Bulk Upload")
+    st.caption("CSV columns: " + ", ".join(PRODUCT_COLUMNS))
+    f = st.file_uploader("Products CSV", type="csv")
+    if f and st.button("Import"):
+        import pandas as pd
+        n = 0
+        try:
+            # One transaction per 10k-row chunk keeps memory flat on large files
+            for chunk in pd.read_csv(f, usecols=PRODUCT_COLUMNS, chunksize=10000):
+                chunk = chunk[PRODUCT_COLUMNS].astype({'price': float, 'cost': float, 'stock': float})
+                bad = chunk[REQUIRED_PRODUCT_COLUMNS].isna().any(axis=1) | (chunk[['price', 'cost', 'stock']] < 0).any(axis=1) | (chunk['stock'] % 1 != 0)
+                if bad.any():
+                    lines = ", ".join(str(i + 2) for i in chunk.index[bad])  # +2: 0-based index, header line
+                    st.error(f"Import stopped after {n} products: CSV lines {lines} have a blank {'/'.join(REQUIRED_PRODUCT_COLUMNS)} field, a negative price/cost/stock or a fractional stock."); return
+                chunk = chunk.astype({'stock': int})
+                insert_products(chunk.astype(object).where(chunk.notna(), None).values.tolist())
+                n += len(chunk)
+        except ValueError as e: st.error(f"Import stopped after {n} products: {e}"); return
+        st.success(f"Imported {n} products.")
+
+@st.cache_data(max_entries=1, ttl=60)
+def inventory_table():
+    import pyarrow as pa
+    rows = db.query("SELECT product_id, name, description, category, price, cost, stock, image_url FROM PRODUCTS")
+    pid, name, description, category, price, cost, stock, image_url = zip(*rows) if rows else [()] * 8
+    # Typed Arrow columns go to the browser as-is; category repeats, so it is dictionary-encoded
+    return pa.table({
+        'product_id': pa.array(pid, pa.int64()), 'name': pa.array(name, pa.string()),
+        'description': pa.array(description, pa.string()), 'category': pa.array(category, pa.string()).dictionary_encode(),
+        'price': pa.array(price, pa.float64()), 'cost': pa.array(cost, pa.float64()),
+        'stock': pa.array(stock, pa.int64()), 'image_url': pa.array(image_url, pa.string()),
+    })
+
 def dashboard_page():
     st.title("🛡️ Admin Panel")
     user = st.session_state['user_details']
     if user['role'] != 'admin':
         st.error("Unauthorized"); return
-    t1, t2, t3 = st.tabs(["Analytics", "Defects", "Inventory"])
+    t1, t2, t3, t4 = st.tabs(["Analytics", "Defects", "Inventory", "Bulk Upload"])
     with t1: admin_analytics()
     with t2: admin_defects()
-    with t3: st.dataframe(db.query_df("SELECT * FROM PRODUCTS"))
+    with t3: st.dataframe(inventory_table())
+    with t4: admin_bulk_upload()
 
 # --- STOREFRONT ---
 def shop_page():
     st.title("The Shop")
+    render_catalog()
+
+# Filter and paging widgets rerun only this fragment, not the whole script
+@st.fragment
+def render_catalog():
     # --- Category Filter ---
-    categories = ["All"] + [r['category'] for r in db.query("SELECT DISTINCT category FROM PRODUCTS")]
-    selected_cat = st.selectbox("Filter Products", categories)
-    
-    q = "SELECT * FROM PRODUCTS" if selected_cat == "All" else "SELECT * FROM PRODUCTS WHERE category=?"
-    p = () if selected_cat == "All" else (selected_cat,)
-    prods = db.query(q, p)
+    categories = ["All"] + get_categories()
+    reset_page = lambda: st.session_state.update({'catalog_page': 0})
+    selected_cat = st.selectbox("Filter Products", categories, on_change=reset_page)
+    search = st.text_input("Search", placeholder="Name, description or category", on_change=reset_page)
+
+    page = st.session_state['catalog_page']
+    prods = get_catalog_page(selected_cat, search, page)
+    has_next = len(prods) > CATALOG_PAGE_SIZE
+    prods = prods[:CATALOG_PAGE_SIZE]
 
     cols = st.columns(3)
-    for i, p in enumerate(prods):
+    for i, (pid, name, price, image_url) in enumerate(prods):
         with cols[i % 3]:
-            st.image(p['image_url'])
-            st.subheader(p['name'])
-            if st.button(f"View - ${p['price']}", key=p['product_id']):
-                st.session_state['selected_product_id'] = p['product_id']
+            st.image(image_url)
+            st.subheader(name)
+            if st.button(f"View - ${price}", key=pid):
+                st.session_state['selected_product_id'] = pid
                 st.session_state['page'] = 'product_detail'
                 st.rerun()
 
+    c1, c2, c3 = st.columns([1, 1, 4])
+    c1.button("◀ Prev", disabled=page == 0, on_click=lambda: st.session_state.update({'catalog_page': page - 1}))
+    c2.button("Next ▶", disabled=not has_next, on_click=lambda: st.session_state.update({'catalog_page': page + 1}))
+    c3.caption(f"Page {page + 1}")
+
 def product_detail_page():
     pid = st.session_state.get('selected_product_id')
-    res = db.query("SELECT * FROM PRODUCTS WHERE product_id=?", (pid,)) if pid else None
+    res = get_product(pid) if pid else None
     if not res: st.session_state['page'] = 'shop'; st.rerun()
-    p = res[0]
+    name, description, price, cost, stock, image_url = res
     
     col1, col2 = st.columns(2)
-    with col1: st.image(p['image_url'])
+    with col1: st.image(image_url)
     with col2:
-        st.title(p['name'])
-        st.write(p['description'])
-        # --- Size & Qty ---
-        sz = st.selectbox("Size", ["S", "M", "L", "XL"])
-        qt = st.number_input("Quantity", 1, p['stock'], 1)
-        if st.button("Add to Cart"):
-            st.session_state['cart'].append({'name': p['name'], 'price': p['price'], 'size': sz, 'qty': qt, 'total': p['price']*qt})
+        st.title(name)
+        st.write(description)
+        if stock < 1: st.warning("Out of stock"); return
+        render_purchase(pid, name, price, cost, stock)
+
+# Size, quantity and Add to Cart rerun only this fragment; the cart lives in session state
+@st.fragment
+def render_purchase(pid, name, price, cost, stock):
+    # --- Size & Qty ---
+    sz = st.selectbox("Size", ["S", "M", "L", "XL"])
+    qt = st.number_input("Quantity", 1, stock, 1)
+    if st.button("Add to Cart"):
+        cart = st.session_state['cart']
+        # One line per (product, size); stock is shared across sizes so cap the product's total
+        line = next((i for i in cart if i['product_id'] == pid and i['size'] == sz), None)
+        in_cart = sum(i['qty'] for i in cart if i['product_id'] == pid)
+        if in_cart + qt > stock: st.error(f"Only {stock - in_cart} more in stock.")
+        else:
+            if line: line['qty'] += qt
+            else: cart.append({'product_id': pid, 'name': name, 'price': price, 'cost': cost, 'size': sz, 'qty': qt})
             st.success("Added!")
 
+class OutOfStock(Exception):
+    pass
+
+def place_order(email, cart):
+    order_id = str(uuid.uuid4())
+    total = sum(i['price'] * i['qty'] for i in cart)
+    need = {}  # sizes share stock, so sum quantities per product
+    for i in cart: need[i['product_id']] = need.get(i['product_id'], 0) + i['qty']
+    try:
+        with db.transaction() as conn:
+            # Every decrement in one guarded statement; products without enough stock are left untouched
+            case = "CASE product_id " + "WHEN ? THEN ? " * len(need) + "END"
+            pairs = tuple(x for pid_qty in need.items() for x in pid_qty)
+            updated = conn.execute(f"UPDATE PRODUCTS SET stock = stock - {case} WHERE product_id IN ({','.join('?' * len(need))}) AND stock >= {case}",
+                                   (*pairs, *need, *pairs)).rowcount
+            if updated != len(need): raise OutOfStock()
+            items = [(order_id, i['product_id'], i['size'], i['qty'], i['price'], i['cost']) for i in cart]
+            total_cost = sum(qty * cost for _, _, _, qty, _, cost in items)
+            conn.execute("INSERT INTO ORDERS (order_id, email, order_date, total_amount, total_cost, total_profit, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (order_id, email, datetime.datetime.now().isoformat(sep=' ', timespec='seconds'), total, total_cost, total - total_cost, 'Placed'))
+            conn.executemany("INSERT INTO ORDER_ITEMS (order_id, product_id, size, quantity, unit_price, unit_cost) VALUES (?, ?, ?, ?, ?, ?)", items)
+    except OutOfStock:
+        # Rolled back by now; only the failure path pays for a lookup to name the short product
+        stock = dict(db.query(f"SELECT product_id, stock FROM PRODUCTS WHERE product_id IN ({','.join('?' * len(need))})", tuple(need)))
+        raise OutOfStock(next((i['name'] for i in cart if stock.get(i['product_id'], 0) < need[i['product_id']]), cart[0]['name'])) from None
+    get_product.clear(); inventory_table.clear()
+    return order_id
+
 def checkout_page():
     st.title("Your Cart")
     if not st.session_state['cart']: st.warning("Cart is empty"); return
-    df = pd.DataFrame(st.session_state['cart'])
-    st.table(df)
+    render_checkout()
+
+@st.fragment
+def render_checkout():
+    # A cart is a handful of lines: plain Python beats building a DataFrame on every rerun
+    rows = [{'name': i['name'], 'size': i['size'], 'qty': i['qty'], 'price': i['price'], 'total': i['price'] * i['qty']} for i in st.session_state['cart']]
+    st.table(rows)
+    st.metric("Total", f"${sum(r['total'] for r in rows):.2f}")
     if st.button("Place Order"):
+        try: place_order(st.session_state['user_details']['email'], st.session_state['cart'])
+        except OutOfStock as e: st.error(f"Not enough stock left for {e}."); return
         st.balloons(); st.session_state['cart'] = []; st.success("Done!"); time.sleep(1); st.session_state['page'] = 'shop'; st.rerun()
 
 # --- SIGN UP & LOGIN ---
@@ -150,7 +372,8 @@ def signup_page():
         if st.form_submit_button("Register"):
             if not email or not pw: st.error("Fields required")
             else:
-                db.query("INSERT INTO USERS (email, username, password_hash, role) VALUES (?, ?, ?, ?)", (email, user, hash_password(pw), 'customer'), commit=True)
+                salt = os.urandom(16)
+                db.execute("INSERT INTO USERS (email, username, password_hash, role, salt) VALUES (?, ?, ?, ?, ?)", (email, user, hash_password(pw, salt), 'customer', salt))
                 st.success("Account created! Log in now."); st.session_state['page'] = 'login'; st.rerun()
     if st.button("Back to Login"): st.session_state['page'] = 'login'; st.rerun()
 
@@ -161,9 +384,13 @@ def login_page():
     c1, c2 = st.columns([1, 2])
     with c1:
         if st.button("Login"):
-            res = db.query("SELECT * FROM USERS WHERE email=?", (email,))
-            if res and res[0]['password_hash'] == hash_password(pw):
-                st.session_state.update({'logged_in': True, 'user_details': dict(res[0]), 'page': 'shop'})
+            res = db.query("SELECT password_hash, salt, username, role FROM USERS WHERE email=?", (email,))
+            pw_hash, salt, username, role = res[0] if res else (DUMMY_HASH, DUMMY_SALT, None, None)
+            if verify_password(pw, salt, pw_hash) and res:
+                if password_outdated(salt, pw_hash):
+                    salt = os.urandom(16)
+                    db.execute("UPDATE USERS SET password_hash=?, salt=? WHERE email=?", (hash_password(pw, salt), salt, email))
+                st.session_state.update({'logged_in': True, 'user_details': {'email': email, 'username': username, 'role': role}, 'page': 'shop'})
                 st.rerun()
             else: st.error("Failed")
     with c2:
@@ -171,8 +398,7 @@ def login_page():
             st.session_state['page'] = 'signup'; st.rerun()
 
 # --- APP START ---
-if 'logged_in' not in st.session_state:
-    st.session_state.update({'logged_in': False, 'page': 'login', 'cart': []})
+st.session_state.update({k: v() if callable(v) else v for k, v in SESSION_DEFAULTS.items() if k not in st.session_state})
 
 if st.session_state['logged_in']:
     u = st.session_state['user_details']
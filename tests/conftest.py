@@ -0,0 +1,33 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP = str(Path(__file__).resolve().parents[1] / "streamlit_app.py")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # The app keeps its database next to the working directory; start each test from a fresh one
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear(); st.cache_data.clear()
+    return AppTest.from_file(APP, default_timeout=30).run()
+
+
+@pytest.fixture
+def shop(app):
+    return login(app, "admin@shop.com", "admin")
+
+
+def login(at, email, pw):
+    at.text_input[0].input(email); at.text_input[1].input(pw)
+    next(b for b in at.button if b.label == "Login").click().run()
+    assert not at.exception
+    return at
+
+
+def rows(q, p=()):
+    with sqlite3.connect("tshirt_shop_premium.db") as conn:
+        return conn.execute(q, p).fetchall()
@@ -0,0 +1,57 @@
+import pytest
+
+from conftest import rows
+
+HEADER = "name,description,category,price,cost,stock,image_url\n"
+
+
+@pytest.fixture
+def admin(shop):
+    next(b for b in shop.sidebar.button if "Admin" in b.label).click().run()
+    assert not shop.exception
+    return shop
+
+
+def upload(at, csv):
+    at.file_uploader[0].upload("products.csv", (HEADER + csv).encode(), "text/csv").run()
+    next(b for b in at.button if b.label == "Import").click().run()
+    assert not at.exception
+
+
+def product_names():
+    return [r[0] for r in rows("SELECT name FROM PRODUCTS ORDER BY product_id")]
+
+
+def open_shop(at):
+    next(b for b in at.sidebar.button if b.label == "Shop").click().run()
+    assert not at.exception
+    return [b.label for b in at.button if b.label.startswith("View")]
+
+
+@pytest.mark.parametrize("bad", [
+    "No Image,,Mug,9.5,3,10,\n",
+    "No Price,,Mug,,3,10,https://placehold.co/1\n",
+    "Half Stock,,Mug,9.5,3,1.5,https://placehold.co/1\n",
+    "Negative,,Mug,-5,3,-2,https://placehold.co/1\n",
+    "Negative Cost,,Mug,9.5,-1,10,https://placehold.co/1\n",
+    "No Category,,,9.5,3,10,https://placehold.co/1\n",
+])
+def test_bad_rows_reject_the_import(admin, bad):
+    before = product_names()
+    upload(admin, "Good,,Mug,9.5,3,10,https://placehold.co/1\n" + bad)
+    assert "CSV lines 3 " in admin.error[0].value
+    assert product_names() == before
+    assert len(open_shop(admin)) == len(before)
+
+
+def test_valid_rows_are_imported(admin):
+    upload(admin, "Bulk A,,Mug,9.5,3,10,https://placehold.co/1\nBulk B,Nice,Cap,12,5,4,https://placehold.co/2\n")
+    assert admin.success[0].value == "Imported 2 products."
+    assert product_names()[-2:] == ["Bulk A", "Bulk B"]
+    assert len(open_shop(admin)) == len(product_names())
+
+
+def test_large_stock_still_renders_the_dashboard(admin):
+    upload(admin, "Warehouse,,Mug,9.5,3,3000000000,https://placehold.co/1\n")
+    assert admin.success[0].value == "Imported 1 products."
+    assert not admin.run().exception
@@ -0,0 +1,43 @@
+import sqlite3
+
+from conftest import rows
+
+TEE = {'product_id': 1, 'name': 'Vintage Coding Tee', 'price': 25.0, 'cost': 10.0}
+HOODIE = {'product_id': 2, 'name': 'Python Logo Hoodie', 'price': 55.0, 'cost': 25.0}
+
+
+def checkout(at, cart, stock):
+    # Stock is set after the cart is filled, as if other orders sold it in the meantime
+    with sqlite3.connect("tshirt_shop_premium.db") as conn:
+        conn.executemany("UPDATE PRODUCTS SET stock=? WHERE product_id=?", [(s, pid) for pid, s in stock.items()])
+    at.session_state['cart'] = cart
+    next(b for b in at.sidebar.button if b.label == "Cart").click().run()
+    next(b for b in at.button if b.label == "Place Order").click().run()
+    assert not at.exception
+    return at
+
+
+def stock():
+    return dict(rows("SELECT product_id, stock FROM PRODUCTS"))
+
+
+def test_short_product_rolls_back_the_whole_order(shop):
+    cart = [{**TEE, 'size': 'M', 'qty': 2}, {**HOODIE, 'size': 'L', 'qty': 3}]
+    checkout(shop, cart, {1: 10, 2: 1})
+    assert shop.error[0].value == "Not enough stock left for Python Logo Hoodie."
+    assert stock() == {1: 10, 2: 1}
+    assert rows("SELECT COUNT(*) FROM ORDERS") == [(0,)]
+    assert rows("SELECT COUNT(*) FROM ORDER_ITEMS") == [(0,)]
+
+
+def test_sizes_are_checked_against_their_summed_quantity(shop):
+    cart = [{**TEE, 'size': 'S', 'qty': 3}, {**TEE, 'size': 'M', 'qty': 3}]
+    checkout(shop, cart, {1: 5})
+    assert shop.error[0].value == "Not enough stock left for Vintage Coding Tee."
+    assert stock()[1] == 5 and rows("SELECT COUNT(*) FROM ORDERS") == [(0,)]
+
+    checkout(shop, cart, {1: 6})
+    assert not shop.error
+    assert stock()[1] == 0
+    assert rows("SELECT total_amount, total_cost FROM ORDERS") == [(150.0, 60.0)]
+    assert rows("SELECT size, quantity FROM ORDER_ITEMS ORDER BY size") == [('M', 3), ('S', 3)]
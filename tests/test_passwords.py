@@ -0,0 +1,37 @@
+import hashlib
+import hmac
+import os
+
+import pytest
+
+from conftest import login, rows
+
+SALT = os.urandom(16)
+# The three formats a USERS row can hold: unsalted SHA-256, salted HMAC-SHA256 and the current scrypt
+FORMATS = {
+    'sha256': (None, hashlib.sha256(b"hunter2").hexdigest()),
+    'hmac': (SALT, hmac.new(SALT, b"hunter2", 'sha256').hexdigest()),
+    'scrypt': (SALT, 'scrypt$' + hashlib.scrypt(b"hunter2", salt=SALT, n=2**14, r=8, p=1).hex()),
+}
+
+
+@pytest.fixture(params=FORMATS)
+def user(request, app):
+    salt, pw_hash = FORMATS[request.param]
+    rows("INSERT INTO USERS (email, username, password_hash, role, salt) VALUES (?, ?, ?, ?, ?)",
+         ('old@shop.com', 'Old Customer', pw_hash, 'customer', salt))
+    return app, salt, pw_hash
+
+
+def test_login_upgrades_to_scrypt(user):
+    app, salt, pw_hash = user
+    assert [t.value for t in login(app, "old@shop.com", "hunter2").title] == ["The Shop"]
+    [(new_hash, new_salt)] = rows("SELECT password_hash, salt FROM USERS WHERE email='old@shop.com'")
+    assert new_hash.startswith('scrypt$') and len(new_salt) == 16
+    if pw_hash.startswith('scrypt$'): assert (new_hash, new_salt) == (pw_hash, salt)
+
+
+def test_wrong_password_is_rejected(user):
+    app, salt, pw_hash = user
+    assert [e.value for e in login(app, "old@shop.com", "hunter3").error] == ["Failed"]
+    assert rows("SELECT password_hash, salt FROM USERS WHERE email='old@shop.com'") == [(pw_hash, salt)]